@@ -1,82 +1,242 @@
 import os
+import io
+import gzip
 import json
-import base64
+import orjson
+import pybase64
 import requests
-import boto3
-import uuid
+import hashlib
 import asyncio
-from openai import OpenAI
-from typing import List
+import aiohttp
+import aioboto3
+import httpx
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from openai import AsyncOpenAI
+from typing import List, Optional, Tuple
 from loguru import logger
 from sqlalchemy import create_engine, text
 from datetime import date
-from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
 
 from constants import CaseAnalysisSchema
 
 
-def get_openai_client():
-    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_openai_client = None
 
+def get_openai_client() -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client, constructing it once per container."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=5,
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+                http2=True
+            )
+        )
+    return _openai_client
+
+
+_http_session = None
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session, created lazily on the running event loop.
+
+    The SDK's bundled httpx client degrades past a handful of concurrent
+    requests, so chat completions go through a raw aiohttp POST instead.
+    """
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=200,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+        )
+    return _http_session
 
-def get_s3_client() -> boto3.client:
-    return boto3.client('s3',
-                        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-                        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
 
+async def close_http_session():
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
+# Multipart kicks in above 8 MiB; 50 MiB parts benchmark fastest against S3.
+_S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=50 * 1024 * 1024,
+    max_concurrency=10,
+)
+
+_s3_session = aioboto3.Session()
+_s3_client = None
+_s3_client_ctx = None
+
+async def get_s3_client():
+    """Return the shared async S3 client, entered once on app startup.
+
+    aioboto3 runs PUTs natively on the event loop, so concurrent uploads
+    share one client without thread-hop overhead.
+    """
+    global _s3_client, _s3_client_ctx
+    if _s3_client is None:
+        _s3_client_ctx = _s3_session.client(
+            's3',
+            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+            config=Config(
+                max_pool_connections=100,
+                tcp_keepalive=True,
+                retries={'max_attempts': 3, 'mode': 'adaptive'}
+            )
+        )
+        _s3_client = await _s3_client_ctx.__aenter__()
+    return _s3_client
 
-async def upload_to_storage(base64_data: str, key: str) -> str:
-    """Upload base64 image to S3 and return permanent URL."""
+
+async def close_s3_client():
+    global _s3_client, _s3_client_ctx
+    if _s3_client_ctx is not None:
+        await _s3_client_ctx.__aexit__(None, None, None)
+    _s3_client = None
+    _s3_client_ctx = None
+
+
+_CONTENT_TYPE_EXTENSIONS = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+
+
+def _sniff_content_type(head: bytes) -> Optional[str]:
+    """Detect the image type from the first bytes of the decoded buffer.
+
+    Data-URI headers and client-declared content types are not trusted; a few
+    byte compares on the real bytes are cheaper and can't lie.
+    """
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG'):
+        return 'image/png'
+    if head.startswith(b'GIF8'):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+# Every byte value outside the base64 alphabet, deleted from each chunk before
+# decoding to match b64decode(validate=False) discarding newlines etc.
+_B64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+_B64_DISCARD = bytes(byte for byte in range(256) if byte not in _B64_ALPHABET)
+
+
+def _decode_base64_stream(base64_data: str, chunk_size: int = 256 * 1024) -> io.BytesIO:
+    """Decode base64 into a BytesIO chunk by chunk instead of one giant bytes object.
+
+    Non-alphabet characters (newlines, whitespace) are stripped per chunk, and
+    any trailing partial quantum is carried into the next chunk so slicing
+    never splits a 4-character base64 unit.
+    """
+    buffer = io.BytesIO()
+    carry = b''
+    for offset in range(0, len(base64_data), chunk_size):
+        chunk = base64_data[offset:offset + chunk_size].encode('ascii', 'ignore')
+        chunk = carry + chunk.translate(None, _B64_DISCARD)
+        usable = len(chunk) - (len(chunk) % 4)
+        buffer.write(pybase64.b64decode(chunk[:usable], validate=False))
+        carry = chunk[usable:]
+    if carry:
+        buffer.write(pybase64.b64decode(carry, validate=False))
+    buffer.seek(0)
+    return buffer
+
+
+async def upload_stream_to_storage(buffer: io.BytesIO) -> str:
+    """Upload an image buffer to S3 and return permanent URL.
+
+    The content type is sniffed from the image's magic bytes, and objects are
+    keyed by the SHA-256 of their content, so resubmitting the same screenshot
+    is a HEAD round-trip instead of a re-upload.
+    """
     try:
+        content_type = _sniff_content_type(buffer.read(12))
+        buffer.seek(0)
+        if content_type is None:
+            raise ValueError(f"Unsupported image format. Allowed formats: {list(_CONTENT_TYPE_EXTENSIONS)}")
+
+        hasher = hashlib.sha256()
+        for chunk in iter(lambda: buffer.read(1024 * 1024), b''):
+            hasher.update(chunk)
+        buffer.seek(0)
+
+        digest = hasher.hexdigest()
+        ext = _CONTENT_TYPE_EXTENSIONS[content_type]
+        key = f"cases/sha256/{digest[:2]}/{digest}.{ext}"
+
         logger.debug(f"Starting upload for key: {key}")
         start_time = asyncio.get_event_loop().time()
-        
-        # Default content type
-        content_type = 'image/jpeg'
-        
-        # Check if base64 data has a prefix and extract content type
-        if ',' in base64_data:
-            header, base64_data = base64_data.split(',', 1)
-            if ';base64' in header:
-                content_type = header.split(':')[1].split(';')[0]
-        
-        # Validate content type
-        allowed_types = ['image/png', 'image/jpeg', 'image/gif', 'image/webp']
-        if content_type not in allowed_types:
-            raise ValueError(f"Unsupported image format: {content_type}. Allowed formats: {allowed_types}")
-        
-        # Convert base64 to binary
-        binary_data = base64.b64decode(base64_data)
-        
-        # Use ThreadPoolExecutor for the blocking S3 operation
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as pool:
-            s3_client = get_s3_client()
-            bucket_name = os.getenv('AWS_BUCKET_NAME')
-            
-            logger.debug(f"Initiating S3 upload for key: {key}")
-            await loop.run_in_executor(
-                pool,
-                lambda: s3_client.put_object(
-                    Bucket=bucket_name,
-                    Key=key,
-                    Body=binary_data,
-                    ContentType=content_type,
-                    ContentDisposition='inline',
-                    ACL='public-read'
-                )
-            )
-        
+
+        s3_client = await get_s3_client()
+        bucket_name = os.getenv('AWS_BUCKET_NAME')
+
+        try:
+            await s3_client.head_object(Bucket=bucket_name, Key=key)
+            logger.debug(f"Object already exists, skipping upload for key: {key}")
+            return f"https://{bucket_name}.s3.amazonaws.com/{key}"
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('404', 'NoSuchKey'):
+                raise
+
+        logger.debug(f"Initiating S3 upload for key: {key}")
+        await s3_client.upload_fileobj(
+            buffer,
+            Bucket=bucket_name,
+            Key=key,
+            ExtraArgs={
+                'ContentType': content_type,
+                'ContentDisposition': 'inline',
+                'ACL': 'public-read'
+            },
+            Config=_S3_TRANSFER_CONFIG
+        )
+
         end_time = asyncio.get_event_loop().time()
         duration = end_time - start_time
         logger.debug(f"Completed upload for key: {key} in {duration:.2f} seconds")
-        
+
         # Return permanent URL
         return f"https://{bucket_name}.s3.amazonaws.com/{key}"
     except Exception as e:
-        logger.error(f"Failed to upload to storage for key {key}: {e}")
+        logger.error(f"Failed to upload to storage: {e}")
         raise
 
+
+async def upload_bytes_to_storage(binary_data: bytes) -> str:
+    """Upload raw image bytes to S3 and return permanent URL."""
+    return await upload_stream_to_storage(io.BytesIO(binary_data))
+
+
+async def upload_to_storage(base64_data: str) -> str:
+    """Decode a base64 image and upload it to S3, returning the permanent URL."""
+    # Strip the data-URI header if present; the content type comes from the
+    # decoded bytes, not the header
+    if ',' in base64_data:
+        _, base64_data = base64_data.split(',', 1)
+
+    # Decode chunk-wise so the full string and a full extra copy never coexist
+    buffer = _decode_base64_stream(base64_data)
+
+    return await upload_stream_to_storage(buffer)
+
 async def format_messages(
     system_prompt: str,
     user_prompt: str,
@@ -107,8 +267,7 @@ async def format_messages(
                     logger.warning(f"Unsupported image format: {url[:30]}...")
                     continue
 
-                key = f"cases/{date.today().strftime('%Y/%m/%d')}/{uuid.uuid4()}.jpg"
-                upload_tasks.append(upload_to_storage(base64_data, key))
+                upload_tasks.append(upload_to_storage(base64_data))
             except Exception as e:
                 logger.error(f"Failed to process image data: {e}")
                 continue
@@ -128,15 +287,278 @@ async def format_messages(
     return messages, permanent_urls
 
 
-def call_openai_structured(client: OpenAI, messages: List[dict]) -> CaseAnalysisSchema:
+async def format_messages_from_files(
+    system_prompt: str,
+    user_prompt: str,
+    images: List[bytes] = None
+):
+    """Like format_messages, but takes raw image bytes from multipart uploads
+    so there is no base64 decode at all. GPT-4o fetches the resulting S3 URLs
+    server-side."""
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": user_prompt}
+            ]
+        }
+    ]
+
+    permanent_urls = []
+
+    if images:
+        upload_tasks = [
+            upload_bytes_to_storage(binary_data)
+            for binary_data in images
+        ]
+
+        try:
+            permanent_urls = await asyncio.gather(*upload_tasks)
+            processed_images = [
+                {"type": "image_url", "image_url": {"url": url}}
+                for url in permanent_urls
+            ]
+            messages[1]["content"].extend(processed_images)
+        except Exception as e:
+            logger.error(f"Failed during parallel upload: {e}")
+
+    return messages, permanent_urls
+
+
+def _to_strict_json_schema(schema):
+    """Recursively set additionalProperties: false on every object node.
+
+    Strict json_schema mode rejects any object without it, and pydantic's
+    model_json_schema() does not emit it; the SDK's parse() applies this
+    transform internally, so the raw HTTP path must replicate it.
+    """
+    if isinstance(schema, dict):
+        if schema.get("type") == "object" and "additionalProperties" not in schema:
+            schema["additionalProperties"] = False
+        for value in schema.values():
+            _to_strict_json_schema(value)
+    elif isinstance(schema, list):
+        for item in schema:
+            _to_strict_json_schema(item)
+    return schema
+
+
+# Derived once at import; model_json_schema() walks the model recursively and
+# would otherwise run on every call.
+_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "CaseAnalysisSchema",
+        "schema": _to_strict_json_schema(CaseAnalysisSchema.model_json_schema()),
+        "strict": True,
+    },
+}
+
+# Caps concurrent chat completions so multi-case fan-out stays under rate limits.
+_openai_semaphore = asyncio.Semaphore(50)
+
+
+# Bodies below this are URL-referenced images plus prompt text and not worth
+# compressing; above it the payload is carrying base64 data URIs.
+_GZIP_THRESHOLD = 64 * 1024
+
+
+def _is_transient_error(exc: BaseException) -> bool:
+    """Retry connection drops, timeouts, 429s, and 5xx responses; other HTTP
+    errors are deterministic and retrying them only burns backoff time."""
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status == 429 or exc.status >= 500
+    return isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+@retry(
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception(_is_transient_error),
+    reraise=True,
+)
+async def _post_chat_completion(payload: dict) -> dict:
+    """POST a chat completion, retrying transient failures (429s, timeouts,
+    connection drops) with jittered exponential backoff. Large bodies are
+    gzip-encoded so base64 image data is not sent uncompressed on the wire."""
+    session = await get_http_session()
+    body = orjson.dumps(payload)
+    headers = {
+        "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
+        "Content-Type": "application/json",
+    }
+    if len(body) > _GZIP_THRESHOLD:
+        body = gzip.compress(body)
+        headers["Content-Encoding"] = "gzip"
+    async with session.post(
+        "https://api.openai.com/v1/chat/completions",
+        data=body,
+        headers=headers
+    ) as response:
+        response.raise_for_status()
+        return await response.json()
+
+
+async def call_openai_structured(messages: List[dict]) -> CaseAnalysisSchema:
     logger.debug(f"Starting OpenAI Structured Call")
-    response = client.beta.chat.completions.parse(
-        model="gpt-4o-2024-08-06",
-        messages=messages,
-        response_format=CaseAnalysisSchema,
+    payload = {
+        "model": "gpt-4o-2024-08-06",
+        "messages": messages,
+        "response_format": _RESPONSE_FORMAT,
+    }
+    async with _openai_semaphore:
+        data = await _post_chat_completion(payload)
+    logger.info(f"Total tokens: {data['usage']['total_tokens']}")
+    return CaseAnalysisSchema.model_validate_json(data["choices"][0]["message"]["content"])
+
+
+async def submit_batch(case_messages: List[List[dict]]) -> str:
+    """Submit a list of per-case message arrays as a single OpenAI Batch job.
+
+    Each case is serialized as one JSONL line targeting /v1/chat/completions,
+    uploaded as a batch input file, and returns the batch ID for polling.
+    """
+    client = get_openai_client()
+    lines = []
+    for index, messages in enumerate(case_messages):
+        lines.append(json.dumps({
+            "custom_id": f"case-{index}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": "gpt-4o-2024-08-06",
+                "messages": messages,
+                "response_format": _RESPONSE_FORMAT,
+            },
+        }))
+
+    batch_file = await client.files.create(
+        file=("batch_input.jsonl", "\n".join(lines).encode()),
+        purpose="batch"
+    )
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    logger.info(f"Submitted batch {batch.id} with {len(case_messages)} cases")
+    return batch.id
+
+
+async def retrieve_batch(batch_id: str) -> Tuple[str, Optional[List[Optional[CaseAnalysisSchema]]]]:
+    """Poll a batch by ID. Returns (status, results) where results is populated
+    only once the batch has completed.
+
+    Output lines are matched back to cases by the case-{index} custom_id since
+    the Batch API does not guarantee output order. Results are returned in
+    submission order, with None for any case whose request failed.
+    """
+    client = get_openai_client()
+    batch = await client.batches.retrieve(batch_id)
+    if batch.status != "completed":
+        return batch.status, None
+
+    results = {}
+
+    if batch.output_file_id:
+        output = await client.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            custom_id = entry["custom_id"]
+            response = entry.get("response")
+            if entry.get("error") or not response or response.get("status_code") != 200:
+                logger.error(f"Batch {batch_id} request {custom_id} failed: {entry.get('error') or response}")
+                results[custom_id] = None
+                continue
+            try:
+                results[custom_id] = CaseAnalysisSchema.model_validate_json(
+                    response["body"]["choices"][0]["message"]["content"]
+                )
+            except Exception as e:
+                logger.error(f"Batch {batch_id} request {custom_id} returned an unparseable result: {e}")
+                results[custom_id] = None
+
+    if batch.error_file_id:
+        errors = await client.files.content(batch.error_file_id)
+        for line in errors.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            logger.error(f"Batch {batch_id} request {entry['custom_id']} errored: {entry.get('error')}")
+            results.setdefault(entry["custom_id"], None)
+
+    ordered = [
+        results[custom_id]
+        for custom_id in sorted(results, key=lambda c: int(c.rsplit("-", 1)[1]))
+    ]
+    succeeded = sum(1 for analysis in ordered if analysis is not None)
+    logger.success(f"Batch {batch_id} completed with {succeeded}/{len(ordered)} successful results")
+    return batch.status, ordered
+
+
+# Statements are compiled once at import so per-call work is just binding params.
+_INSERT_CASE_STMT = text("""
+    INSERT INTO viet_cases (
+        title,
+        images,
+        summary,
+        keypoints,
+        translations,
+        created_at
+    ) VALUES (
+        :title,
+        CAST(:images AS JSONB),
+        :summary,
+        CAST(:keypoints AS JSONB),
+        CAST(:translations AS JSONB),
+        :created_at
     )
-    logger.info(f"Total tokens: {response.usage.total_tokens}")
-    return response.choices[0].message.parsed
+    RETURNING id
+""")
+
+_BULK_INSERT_STMT = text("""
+    INSERT INTO viet_cases (
+        title,
+        images,
+        summary,
+        keypoints,
+        translations,
+        created_at
+    )
+    SELECT x.title, x.images, x.summary, x.keypoints, x.translations, x.created_at
+    FROM json_to_recordset(CAST(:payload AS JSON)) AS x(
+        title text,
+        images jsonb,
+        summary text,
+        keypoints jsonb,
+        translations jsonb,
+        created_at date
+    )
+    RETURNING id
+""")
+
+_engine = None
+
+def get_engine():
+    """Return the shared SQLAlchemy engine, constructing it once per container.
+
+    Reusing the engine keeps the connection pool alive across requests instead
+    of paying a fresh TCP+TLS+auth handshake to Postgres on every insert.
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_engine(
+            os.getenv("PGSQL_URL"),
+            pool_size=10,
+            max_overflow=20,
+            pool_recycle=1800,
+            pool_pre_ping=True,
+            executemany_mode="values_plus_batch"
+        )
+    return _engine
 
 
 def store_case_analysis(
@@ -144,38 +566,45 @@ def store_case_analysis(
     image_urls: List[str],
     case_analysis: CaseAnalysisSchema
 ):
-    query = text("""
-        INSERT INTO viet_cases (
-            title,
-            images,
-            summary,
-            keypoints,
-            translations,
-            created_at
-        ) VALUES (
-            :title,
-            CAST(:images AS JSONB),
-            :summary,
-            :keypoints,
-            CAST(:translations AS JSONB),
-            :created_at
-        )
-        RETURNING id
-    """)
-    
     params = {
         "title": title,
-        "images": json.dumps(image_urls),
+        "images": orjson.dumps(image_urls).decode(),
         "summary": case_analysis.summary,
-        "keypoints": case_analysis.key_points,
-        "translations": json.dumps([translation.model_dump() for translation in case_analysis.translations]),
+        "keypoints": orjson.dumps(case_analysis.key_points).decode(),
+        "translations": orjson.dumps([translation.model_dump() for translation in case_analysis.translations]).decode(),
         "created_at": date.today().isoformat()
     }
-    db_url = os.getenv("PGSQL_URL")
-    with create_engine(db_url).connect() as connection:
-        with connection.begin():
-            logger.info(f"Storing generated case analysis: {title}")
-            result = connection.execute(query, params)
-            case_id = result.fetchone()[0]
-            logger.success(f"Successfully stored case analysis with ID: {case_id}")
-            return case_id
+    with get_engine().begin() as connection:
+        logger.info(f"Storing generated case analysis: {title}")
+        case_id = connection.execute(_INSERT_CASE_STMT, params).scalar()
+        logger.success(f"Successfully stored case analysis with ID: {case_id}")
+        return case_id
+
+
+def store_case_analyses_bulk(
+    cases: List[Tuple[str, List[str], CaseAnalysisSchema]]
+) -> List[int]:
+    """Insert many (title, image_urls, analysis) rows in a single round-trip.
+
+    json_to_recordset expands one bound JSON payload into rows server-side,
+    so the statement shape is constant regardless of case count and never
+    hits the Postgres parameter limit.
+    """
+    rows = [
+        {
+            "title": title,
+            "images": image_urls,
+            "summary": case_analysis.summary,
+            "keypoints": case_analysis.key_points,
+            "translations": [translation.model_dump() for translation in case_analysis.translations],
+            "created_at": date.today().isoformat()
+        }
+        for title, image_urls, case_analysis in cases
+    ]
+
+    with get_engine().begin() as connection:
+        logger.info(f"Storing {len(rows)} case analyses in bulk")
+        result = connection.execute(_BULK_INSERT_STMT, {"payload": orjson.dumps(rows).decode()})
+        case_ids = list(result.scalars())
+        logger.success(f"Successfully stored {len(case_ids)} case analyses")
+        return case_ids
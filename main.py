@@ -1,13 +1,14 @@
 import modal
-from fastapi import FastAPI, HTTPException
+import asyncio
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from loguru import logger
 from typing import List
 
 # Local imports
-from models import RequestConfig
-from ai import get_openai_client, format_messages, call_openai_structured, store_case_analysis
+from models import RequestConfig, CaseRequest
+from ai import get_http_session, close_http_session, get_s3_client, close_s3_client, get_engine, format_messages, format_messages_from_files, call_openai_structured, store_case_analysis, store_case_analyses_bulk, submit_batch, retrieve_batch
 from constants import SYSTEM_PROMPT
 
 
@@ -37,12 +38,30 @@ app = modal.App(
     ]
 )
 
-@app.function(timeout=3600)
+# Requests spend most of their time awaiting OpenAI/S3, so one warm container
+# can fan out many concurrent inputs instead of queueing them.
+@app.function(
+    timeout=3600,
+    keep_warm=1,
+    allow_concurrent_inputs=100,
+    concurrency_limit=10
+)
 @modal.asgi_app()
 def fastapi_app():
     logger.success("Started FastAPI")
     return web_app
 
+@web_app.on_event("startup")
+async def startup():
+    await get_http_session()
+    await get_s3_client()
+    get_engine()
+
+@web_app.on_event("shutdown")
+async def shutdown():
+    await close_http_session()
+    await close_s3_client()
+
 @web_app.post("/analyze_case")
 async def analyze_case(
     case_title: str,
@@ -65,9 +84,8 @@ async def analyze_case(
             raise HTTPException(status_code=400, detail="Invalid screenshot URL provided")
     
     try:
-        client = get_openai_client()
-        messages, permanent_urls = await format_messages( 
-            system_prompt=SYSTEM_PROMPT(config),
+        messages, permanent_urls = await format_messages(
+            system_prompt=SYSTEM_PROMPT(config.single_author, config.author_mapping),
             user_prompt=f"Case title: {case_title}\nAdditional context: {additional_context}",
             image_urls=screenshot_urls
         )
@@ -94,7 +112,7 @@ async def analyze_case(
     logger.debug(f"Messages: {messages}")
     
     try:
-        case_analysis = call_openai_structured(client, messages)
+        case_analysis = await call_openai_structured(messages)
         try:
             case_id = store_case_analysis(case_title, permanent_urls, case_analysis)
             return {"case_id": case_id, "title": case_title, "analysis": case_analysis}
@@ -104,4 +122,163 @@ async def analyze_case(
             return {"case_id": None, "title": case_title, "analysis": case_analysis}
     except Exception as e:
         logger.error(f"Error analyzing case: {e}")
-        raise HTTPException(status_code=500, detail="An error occurred while analyzing the case")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="An error occurred while analyzing the case")
+
+@web_app.post("/analyze_case_upload")
+async def analyze_case_upload(
+    case_title: str = Form(...),
+    screenshots: List[UploadFile] = File(...),
+    additional_context: str = Form(None),
+    single_author: bool = Form(False),
+    author_mapping: str = Form(None)
+):
+    # Data Validation
+    if not case_title:
+        raise HTTPException(status_code=400, detail="Case title is required")
+
+    if not screenshots or len(screenshots) == 0:
+        raise HTTPException(status_code=400, detail="At least one screenshot is required")
+
+    config = RequestConfig(single_author=single_author, author_mapping=author_mapping)
+
+    try:
+        images = [await screenshot.read() for screenshot in screenshots]
+        messages, permanent_urls = await format_messages_from_files(
+            system_prompt=SYSTEM_PROMPT(config.single_author, config.author_mapping),
+            user_prompt=f"Case title: {case_title}\nAdditional context: {additional_context}",
+            images=images
+        )
+    except ValueError as e:
+        logger.error(f"Image processing error: {e}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to process images: {str(e)}. Please ensure all images are in supported formats (PNG, JPEG, GIF, or WEBP)"
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error during message formatting: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred while processing the images"
+        )
+
+    if not messages[1]["content"] or len(messages[1]["content"]) <= 1:  # Only has text content
+        raise HTTPException(
+            status_code=400,
+            detail="Failed to process images. Please ensure all images are in supported formats (PNG, JPEG)"
+        )
+
+    try:
+        case_analysis = await call_openai_structured(messages)
+        try:
+            case_id = store_case_analysis(case_title, permanent_urls, case_analysis)
+            return {"case_id": case_id, "title": case_title, "analysis": case_analysis}
+        except Exception as e:
+            logger.error(f"Error storing case analysis: {e}")
+            # Return analysis even if storage failed
+            return {"case_id": None, "title": case_title, "analysis": case_analysis}
+    except Exception as e:
+        logger.error(f"Error analyzing case: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while analyzing the case")
+
+@web_app.post("/analyze_cases")
+async def analyze_cases(cases: List[CaseRequest]):
+    # Data Validation
+    if not cases or len(cases) == 0:
+        raise HTTPException(status_code=400, detail="At least one case is required")
+
+    for case in cases:
+        if not case.case_title:
+            raise HTTPException(status_code=400, detail="Case title is required")
+        if not case.screenshot_urls or len(case.screenshot_urls) == 0:
+            raise HTTPException(status_code=400, detail="At least one screenshot URL is required")
+
+    try:
+        # Build all message sets in parallel, then overlap the OpenAI latency
+        format_results = await asyncio.gather(*[
+            format_messages(
+                system_prompt=SYSTEM_PROMPT(
+                    (case.config or RequestConfig()).single_author,
+                    (case.config or RequestConfig()).author_mapping
+                ),
+                user_prompt=f"Case title: {case.case_title}\nAdditional context: {case.additional_context}",
+                image_urls=case.screenshot_urls
+            )
+            for case in cases
+        ])
+    except Exception as e:
+        logger.error(f"Unexpected error during message formatting: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred while processing the images"
+        )
+
+    for case, (messages, _) in zip(cases, format_results):
+        if not messages[1]["content"] or len(messages[1]["content"]) <= 1:  # Only has text content
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to process images for case '{case.case_title}'. Please ensure all images are in supported formats (PNG, JPEG)"
+            )
+
+    try:
+        analyses = await asyncio.gather(*[
+            call_openai_structured(messages)
+            for messages, _ in format_results
+        ])
+    except Exception as e:
+        logger.error(f"Error analyzing cases: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while analyzing the cases")
+
+    try:
+        case_ids = store_case_analyses_bulk([
+            (case.case_title, permanent_urls, analysis)
+            for case, (_, permanent_urls), analysis in zip(cases, format_results, analyses)
+        ])
+    except Exception as e:
+        logger.error(f"Error storing case analyses: {e}")
+        # Return analyses even if storage failed
+        case_ids = [None] * len(cases)
+
+    return [
+        {"case_id": case_id, "title": case.case_title, "analysis": analysis}
+        for case_id, case, analysis in zip(case_ids, cases, analyses)
+    ]
+
+@web_app.post("/analyze_cases_batch")
+async def analyze_cases_batch(cases: List[CaseRequest]):
+    # Data Validation
+    if not cases or len(cases) == 0:
+        raise HTTPException(status_code=400, detail="At least one case is required")
+
+    for case in cases:
+        if not case.case_title:
+            raise HTTPException(status_code=400, detail="Case title is required")
+        if not case.screenshot_urls or len(case.screenshot_urls) == 0:
+            raise HTTPException(status_code=400, detail="At least one screenshot URL is required")
+
+    try:
+        case_messages = []
+        for case in cases:
+            config = case.config or RequestConfig()
+            messages, _ = await format_messages(
+                system_prompt=SYSTEM_PROMPT(config.single_author, config.author_mapping),
+                user_prompt=f"Case title: {case.case_title}\nAdditional context: {case.additional_context}",
+                image_urls=case.screenshot_urls
+            )
+            case_messages.append(messages)
+
+        batch_id = await submit_batch(case_messages)
+        return {"batch_id": batch_id, "num_cases": len(cases)}
+    except Exception as e:
+        logger.error(f"Error submitting batch: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while submitting the batch")
+
+@web_app.get("/analyze_cases_batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    try:
+        status, results = await retrieve_batch(batch_id)
+        if results is None:
+            return {"batch_id": batch_id, "status": status, "results": None}
+        return {"batch_id": batch_id, "status": status, "results": results}
+    except Exception as e:
+        logger.error(f"Error retrieving batch {batch_id}: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while retrieving the batch")
\ No newline at end of file
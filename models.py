@@ -1,7 +1,15 @@
 from pydantic import BaseModel, Field
+from typing import List
 
 
 class RequestConfig(BaseModel):
     author_mapping: str = Field(default = None, description="A mapping of authors to their names in the conversation. If not provided, the author will be the username of the person sending the message.")
     single_author: bool = Field(default = False)
+
+
+class CaseRequest(BaseModel):
+    case_title: str = Field(description="The title of the case to analyze")
+    screenshot_urls: List[str] = Field(description="Base64-encoded screenshots of the conversation")
+    additional_context: str = Field(default = None)
+    config: RequestConfig = Field(default = None)
     
\ No newline at end of file